@@ -8,11 +8,14 @@ PLUGIN_API_VERSIONS = ["2.0"]
 PLUGIN_LICENSE = ["MIT"]
 PLUGIN_LICENSE_URL = "https://opensource.org/license/MIT"
 
-from typing import Any, List, Set, Tuple, Union
+import os
+from itertools import chain, islice
+from typing import Any, Callable, Iterable, List, Optional, Set, Tuple, Union
 
 from PyQt5 import QtCore, QtWidgets
 
 from mutagen import File as MutagenFile
+from mutagen.mp4 import MP4Cover
 from picard import log
 from picard.album import Album
 from picard.file import File
@@ -23,15 +26,40 @@ from picard.ui.ui_infodialog import Ui_InfoDialog
 from picard.ui.util import StandardButton
 
 
-FileDataMap = List[Tuple[str, str, List[Tuple[str, Any]]]]
+FileDataMap = List[Tuple[str, str]]
+TagParser = Callable[[str], Iterable[Tuple[str, Any]]]
 ItemCapLength = 1000
+RowCapLength = 5000
+ReadBufferSize = 128 * 1024
 
+_ACC_NAME = _("metadata view")
+_ACC_DESC = _("Displays raw tags for selected files")
+_HDR_TAG = _("Tag")
+_HDR_VAL = _("Original Value")
+_LIST_MORE = _("... (+{count} more)")
+_ROWS_HIDDEN = _("{count} rows hidden")
 
-def format_item(item: Any) -> Union[str, List[str]]:
+
+def parse_tags(path: str) -> List[Tuple[str, Any]]:
+    # Open the file once and let mutagen sniff and parse from that handle.
+    with open(path, "rb", buffering=ReadBufferSize) as fh:
+        return list(MutagenFile(fh).items())
+
+
+def format_scalar(item: Any) -> str:
     if isinstance(item, str):
         return item
-    elif isinstance(item, list):
-        return [str(format_item(list_item)) for list_item in item]
+    elif isinstance(item, (int, float)):
+        # Also covers bool; numbers are never long enough to need clamping.
+        return str(item)
+    elif type(item) is bytes or isinstance(item, MP4Cover):
+        # Binary payloads only: bytes subclasses such as MP4FreeForm often hold
+        # text and stay readable below. Two hex digits per byte, so halve the
+        # slice to keep within ItemCapLength characters.
+        stringified = item[: ItemCapLength // 2].hex()
+        if len(item) > ItemCapLength // 2:
+            stringified += "..."
+        return stringified
     else:
         stringified = str(item)
         if len(stringified) > ItemCapLength:
@@ -57,35 +85,134 @@ class RawTagItem(QtWidgets.QItemDelegate):
         size_hint = super().sizeHint(option, index)
         return QtCore.QSize(size_hint.width(), min(160, size_hint.height()))
 
+    def updateEditorGeometry(self, editor, option, index):
+        # Rows have a fixed height, so let the editor grow over the rows below
+        # it to show multiline content.
+        rect = QtCore.QRect(option.rect)
+        rect.setHeight(max(rect.height(), self.sizeHint(option, index).height()))
+        editor.setGeometry(rect)
+
 
-class RawTagTable(QtWidgets.QTableWidget):
+class RawTagModel(QtCore.QAbstractTableModel):
     COLUMN_TAG = 0
     COLUMN_VALUE = 1
     KEY_FLAGS = QtCore.Qt.ItemFlag.ItemIsEnabled | QtCore.Qt.ItemFlag.ItemIsSelectable
     TAG_FLAGS = KEY_FLAGS | QtCore.Qt.ItemFlag.ItemIsEditable
 
-    def __init__(self, tags: List[Tuple[str, Any]], parent=None):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._keys: List[str] = []
+        self._values: List[str] = []
+
+    def set_rows(self, keys: List[str], values: List[str]) -> None:
+        # A single reset instead of per-row inserts, so attached views only
+        # lay out once.
+        self.beginResetModel()
+        self._keys = keys
+        self._values = values
+        self.endResetModel()
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._keys)
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        if parent.isValid():
+            return 0
+        return 2
+
+    def headerData(self, section, orientation, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        if (
+            orientation == QtCore.Qt.Orientation.Horizontal
+            and role == QtCore.Qt.ItemDataRole.DisplayRole
+        ):
+            if section == self.COLUMN_TAG:
+                return _HDR_TAG
+            elif section == self.COLUMN_VALUE:
+                return _HDR_VAL
+        return None
+
+    def flags(self, index):
+        if not index.isValid():
+            return QtCore.Qt.ItemFlag.NoItemFlags
+        if index.column() == self.COLUMN_VALUE:
+            return self.TAG_FLAGS
+        return self.KEY_FLAGS
+
+    def data(self, index, role=QtCore.Qt.ItemDataRole.DisplayRole):
+        # Only text is provided; every other role is left to the view's defaults.
+        if not index.isValid() or role not in (
+            QtCore.Qt.ItemDataRole.DisplayRole,
+            QtCore.Qt.ItemDataRole.EditRole,
+        ):
+            return None
+        if index.column() == self.COLUMN_TAG:
+            return self._keys[index.row()]
+        return self._values[index.row()]
+
+
+class RawTagTable(QtWidgets.QTableView):
+    def __init__(
+        self,
+        tags: Iterable[Tuple[str, Any]],
+        path_row: Optional[str] = None,
+        parent=None,
+    ):
         super().__init__(parent=parent)
 
-        processed_list: List[Tuple[str, str]] = []
+        if path_row is not None:
+            tags = chain((("path", path_row),), tags)
+
+        # Rows are kept as two flat lists rather than one object per cell.
+        # Once RowCapLength rows exist, the rest are only counted, not formatted.
+        keys: List[str] = []
+        values: List[str] = []
+        hidden = 0
         for key, unprocessed_val in tags:
-            value = format_item(unprocessed_val)
-            if isinstance(value, list):
-                for idx, processed_val in enumerate(value):
-                    key = key if idx == 0 else f"[{idx}]"
-                    processed_list.append((key, processed_val))
+            if isinstance(unprocessed_val, list):
+                shown = min(len(unprocessed_val), ItemCapLength)
+                room = RowCapLength - len(keys)
+                # Each list entry becomes its own row, formatted in place.
+                visible = islice(unprocessed_val, min(shown, room))
+                for idx, sub_val in enumerate(visible):
+                    keys.append(key if idx == 0 else f"[{idx}]")
+                    values.append(format_scalar(sub_val))
+                hidden += max(0, shown - room)
+                if len(unprocessed_val) > ItemCapLength:
+                    if len(keys) < RowCapLength:
+                        keys.append(f"[{ItemCapLength}]")
+                        values.append(
+                            _LIST_MORE.format(
+                                count=len(unprocessed_val) - ItemCapLength
+                            )
+                        )
+                    else:
+                        hidden += 1
+            elif len(keys) < RowCapLength:
+                keys.append(key)
+                values.append(format_scalar(unprocessed_val))
             else:
-                processed_list.append((key, value))
+                hidden += 1
 
-        self.setAccessibleName(_("metadata view"))
-        self.setAccessibleDescription(_("Displays raw tags for selected files"))
-        self.setColumnCount(2)
-        self.setHorizontalHeaderLabels((_("Tag"), _("Original Value")))
+        if hidden:
+            keys.append("…")
+            values.append(_ROWS_HIDDEN.format(count=hidden))
+
+        self.setAccessibleName(_ACC_NAME)
+        self.setAccessibleDescription(_ACC_DESC)
+        model = RawTagModel(self)
+        model.set_rows(keys, values)
+        self.setModel(model)
         self.horizontalHeader().setStretchLastSection(True)
         self.horizontalHeader().setSectionResizeMode(
             QtWidgets.QHeaderView.ResizeMode.ResizeToContents
         )
         self.horizontalHeader().setSectionsClickable(False)
+        # A fixed row height avoids measuring every row's contents up front.
+        self.verticalHeader().setSectionResizeMode(
+            QtWidgets.QHeaderView.ResizeMode.Fixed
+        )
         self.verticalHeader().setDefaultSectionSize(21)
         self.verticalHeader().setVisible(False)
         self.setHorizontalScrollMode(
@@ -95,31 +222,18 @@ class RawTagTable(QtWidgets.QTableWidget):
             QtWidgets.QAbstractItemView.SelectionMode.ExtendedSelection
         )
         self.setTabKeyNavigation(False)
-        self.setStyleSheet("QTableWidget {border: none;}")
+        self.setStyleSheet("QTableView {border: none;}")
         self.setAttribute(QtCore.Qt.WidgetAttribute.WA_MacShowFocusRect, True)
-        self.setItemDelegate(RawTagItem(self))
+        self.setItemDelegateForColumn(RawTagModel.COLUMN_VALUE, RawTagItem(self))
         self.setWordWrap(False)
 
-        self.setRowCount(len(processed_list))
-
-        for idx, (key, value) in enumerate(processed_list):
-            tag_item = QtWidgets.QTableWidgetItem()
-            tag_item.setFlags(self.KEY_FLAGS)
-            self.setItem(idx, self.COLUMN_TAG, tag_item)
-            tag_item.setText(key)
-
-            value_item = QtWidgets.QTableWidgetItem()
-            value_item.setFlags(self.TAG_FLAGS)
-            self.setItem(idx, self.COLUMN_VALUE, value_item)
-            value_item.setText(value)
-            self.setRowHeight(idx, self.sizeHintForRow(idx))
-
 
 class RawInfoDialog(PicardDialog):
 
-    def __init__(self, data: "FileDataMap", parent=None):
+    def __init__(self, data: "FileDataMap", parser: "TagParser", parent=None):
         super().__init__(parent)
         self.data = data
+        self.parser = parser
         self.ui = Ui_InfoDialog()
         self.ui.setupUi(self)
         self.ui.buttonBox.addButton(
@@ -132,55 +246,98 @@ class RawInfoDialog(PicardDialog):
         self.ui.tabWidget.removeTab(0)
         self.ui.tabWidget.removeTab(0)
 
-        for base_filename, path, raw_data in data:
-            raw_data.insert(0, ("path", path))
-            file_tab = RawTagTable(raw_data)
-            file_tab.setObjectName(base_filename)
-            self.ui.tabWidget.addTab(file_tab, base_filename)
+        # Tabs start out as placeholders and are only parsed once shown.
+        self._built = [False] * len(data)
+        for base_filename, _path in data:
+            self.ui.tabWidget.addTab(QtWidgets.QWidget(), base_filename)
+
+        self.ui.tabWidget.currentChanged.connect(self._ensure_built)
+        self._ensure_built(self.ui.tabWidget.currentIndex())
 
         self.setWindowTitle(_("Track Info"))
 
+    def _ensure_built(self, idx: int) -> None:
+        if idx < 0 or self._built[idx]:
+            return
+
+        base_filename, path = self.data[idx]
+        try:
+            raw_data = self.parser(path)
+        except FileNotFoundError:
+            log.error(f"[{PLUGIN_NAME}] file not found: {path}")
+            raw_data = []
+        except BaseException as e:
+            log.error(f"[{PLUGIN_NAME}] failure parsing file {path}: {e}")
+            raw_data = []
+
+        file_tab = RawTagTable(raw_data, path_row=path)
+        file_tab.setObjectName(base_filename)
+
+        # Swapping the tab would otherwise move the selection and build a
+        # neighbouring tab as well.
+        tab_widget = self.ui.tabWidget
+        placeholder = tab_widget.widget(idx)
+        tab_widget.blockSignals(True)
+        try:
+            tab_widget.removeTab(idx)
+            tab_widget.insertTab(idx, file_tab, base_filename)
+            tab_widget.setCurrentIndex(idx)
+        finally:
+            tab_widget.blockSignals(False)
+        placeholder.deleteLater()
+        self._built[idx] = True
+
 
 class ShowRawTags(BaseAction):
     NAME = "Show Raw Tags"
 
     def callback(self, objs) -> None:
-        data: "FileDataMap" = []
+        files: "FileDataMap" = []
         seen_paths: Set[str] = set()
+        albums_seen: Set[int] = set()
+
+        def add_file(file: File):
+            path = file.filename
+            # Compare physical files so that symlinks and differently cased
+            # paths are only parsed once, but keep the path for display.
+            canonical = os.path.normcase(os.path.realpath(path))
+            if canonical in seen_paths:
+                return
+
+            files.append((file.base_filename, path))
+            seen_paths.add(canonical)
+
+        def handle_track(track: Track):
+            for file in track.files:
+                add_file(file)
+
+        def handle_album(album: Album):
+            if id(album) in albums_seen:
+                return
+            albums_seen.add(id(album))
+
+            for track_or_file in album.iterfiles():
+                parse_item(track_or_file)
+
+        handlers = {File: add_file, Track: handle_track, Album: handle_album}
 
         def parse_item(obj: Union[Album, File, Track]):
-            if isinstance(obj, File):
-                path = obj.filename
-                if path in seen_paths:
+            handler = handlers.get(type(obj))
+            if handler is None:
+                # Picard mostly hands out subclasses (e.g. one per file
+                # format), so resolve those once and remember the result.
+                for base_type, base_handler in tuple(handlers.items()):
+                    if isinstance(obj, base_type):
+                        handler = handlers[type(obj)] = base_handler
+                        break
+                else:
                     return
-
-                try:
-                    mutagenFile = MutagenFile(path)
-                    data.append((obj.base_filename, path, mutagenFile.items()))
-                except BaseException as e:
-                    log.error(f"[{PLUGIN_NAME}] failure parsing file {path}: {e}")
-
-                seen_paths.add(path)
-            elif isinstance(obj, Track):
-                for file in obj.files:
-                    path = file.filename
-                    try:
-                        if path in seen_paths:
-                            return
-                        mutagenFile = MutagenFile(path)
-                        data.append((file.base_filename, path, mutagenFile.items()))
-                    except BaseException as e:
-                        log.error(f"[{PLUGIN_NAME}] failure parsing file {path}: {e}")
-
-                    seen_paths.add(path)
-            elif isinstance(obj, Album):
-                for track_or_file in obj.iterfiles():
-                    parse_item(track_or_file)
+            handler(obj)
 
         for obj in objs:
             parse_item(obj)
 
-        RawInfoDialog(data).exec()
+        RawInfoDialog(files, parse_tags).exec()
 
 
 register_file_action(ShowRawTags())